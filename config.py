@@ -18,9 +18,52 @@ ML_RATINGS = DATA_RAW / "ratings_ml.csv"
 
 TMDB_MOVIES = DATA_RAW / "movies_tmdb.csv"
 
-MEDIATED_PATH               = DATA_PROC / "mediated_movies_all_sources.csv"
-INTEGRATED_MOVIES_PATH      = DATA_PROC / "integrated_movies.csv"
-ML_RATINGS_INTEGRATED_PATH  = DATA_PROC / "movielens_ratings_integrated.csv"
+# Column dtypes for the raw CSVs (also used as usecols)
+IMDB_BASICS_DTYPES = {
+    "tconst": "string",
+    "primaryTitle": "string",
+    "startYear": "Int16",
+    "genres": "string",
+}
+IMDB_RATINGS_DTYPES = {
+    "tconst": "string",
+    "averageRating": "float32",
+    "numVotes": "Int32",
+}
+ML_MOVIES_DTYPES = {
+    "movieId": "int32",
+    "title": "string",
+    "genres": "string",
+}
+ML_RATINGS_DTYPES = {
+    "userId": "int32",
+    "movieId": "int32",
+    "rating": "float32",
+    "timestamp": "int32",
+}
+IMDB_NA_VALUES = ["\\N"]
+
+# PyArrow CSV parsing + Parquet intermediates; set False to fall back to plain CSV
+USE_ARROW = True
+CSV_READ_KWARGS = {"engine": "pyarrow", "dtype_backend": "pyarrow"} if USE_ARROW else {}
+PROC_EXT = ".parquet" if USE_ARROW else ".csv"
+
+MEDIATED_PATH               = DATA_PROC / f"mediated_movies_all_sources{PROC_EXT}"
+INTEGRATED_MOVIES_PATH      = DATA_PROC / f"integrated_movies{PROC_EXT}"
+ML_RATINGS_INTEGRATED_PATH  = DATA_PROC / f"movielens_ratings_integrated{PROC_EXT}"
+
+# Raw-source caches written by the loaders when called with cache=True
+IMDB_RAW_CACHE_PATH         = DATA_PROC / f"imdb_movies_raw{PROC_EXT}"
+ML_MOVIES_RAW_CACHE_PATH    = DATA_PROC / f"movielens_movies_raw{PROC_EXT}"
+ML_RATINGS_RAW_CACHE_PATH   = DATA_PROC / f"movielens_ratings_raw{PROC_EXT}"
+
+# Fitted recommender matrices and lookups written by MovieRecommender.save()
+MODEL_DIR                   = DATA_PROC / "model"
+
+# Catalog size from which new-user recommendations use an HNSW index
+# (needs the optional hnswlib package) instead of a brute-force scan
+ANN_MIN_MOVIES = 50_000
+ANN_EF = 100
 
 load_dotenv()
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
@@ -1,6 +1,8 @@
-import csv
 import os
 
+import pyarrow as pa
+from pyarrow import csv
+
 print("Running in:", os.getcwd())
 
 basics_path = "data/title.basics.tsv"
@@ -10,37 +12,24 @@ basics_out = "data/basics_clean.csv"
 ratings_out = "data/ratings_clean.csv"
 
 
-with open(basics_path, "r", encoding="utf-8") as infile, \
-     open(basics_out, "w", newline="", encoding="utf-8") as outfile:
-
-    reader = csv.DictReader(infile, delimiter="\t")
-    writer = csv.writer(outfile)
+def convert_tsv(in_path, out_path, columns):
+    """Stream the selected columns of an IMDb TSV into a CSV, batch by batch."""
+    # IMDb TSVs are unquoted; keep every field as a string ("\N" included)
+    reader = csv.open_csv(
+        in_path,
+        parse_options=csv.ParseOptions(delimiter="\t", quote_char=False),
+        convert_options=csv.ConvertOptions(
+            include_columns=columns,
+            column_types={c: pa.string() for c in columns},
+        ),
+    )
+    with csv.CSVWriter(out_path, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
 
-    writer.writerow(["tconst", "primaryTitle", "startYear", "genres"])
-
-    for row in reader:
-        writer.writerow([
-            row["tconst"],
-            row["primaryTitle"],
-            row["startYear"],
-            row["genres"],
-        ])
 
+convert_tsv(basics_path, basics_out, ["tconst", "primaryTitle", "startYear", "genres"])
 print("Created:", basics_out)
 
-with open(ratings_path, "r", encoding="utf-8") as infile, \
-     open(ratings_out, "w", newline="", encoding="utf-8") as outfile:
-
-    reader = csv.DictReader(infile, delimiter="\t")
-    writer = csv.writer(outfile)
-
-    writer.writerow(["tconst", "averageRating", "numVotes"])
-
-    for row in reader:
-        writer.writerow([
-            row["tconst"],
-            row["averageRating"],
-            row["numVotes"],
-        ])
-
-print("Created:", ratings_out)
\ No newline at end of file
+convert_tsv(ratings_path, ratings_out, ["tconst", "averageRating", "numVotes"])
+print("Created:", ratings_out)
@@ -1,52 +1,117 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
 
 from config import (
     IMDB_BASICS, IMDB_RATINGS,
     ML_MOVIES, ML_RATINGS,
-    TMDB_MOVIES, DATA_PROC
+    TMDB_MOVIES, CSV_READ_KWARGS, USE_ARROW,
+    IMDB_RAW_CACHE_PATH, ML_MOVIES_RAW_CACHE_PATH, ML_RATINGS_RAW_CACHE_PATH,
+    IMDB_BASICS_DTYPES, IMDB_RATINGS_DTYPES, IMDB_NA_VALUES,
+    ML_MOVIES_DTYPES, ML_RATINGS_DTYPES,
 )
+from utils import save_df
 
 print("IMDB_BASICS:", IMDB_BASICS, "exists?", IMDB_BASICS.exists())
 print("IMDB_RATINGS:", IMDB_RATINGS, "exists?", IMDB_RATINGS.exists())
 
-def load_imdb_raw():
-    """Load IMDb basics + ratings from your CSV files."""
+
+def _read_imdb_arrow(path, dtypes: dict) -> pa.Table:
+    """Parse a memory-mapped IMDb CSV straight into an Arrow table using a config dtype schema."""
+    column_types = {}
+    for col, name in dtypes.items():
+        dtype = pd.api.types.pandas_dtype(name)
+        column_types[col] = pa.string() if name == "string" else pa.from_numpy_dtype(
+            getattr(dtype, "numpy_dtype", dtype)
+        )
+
+    with pa.memory_map(str(path)) as source:
+        return pa_csv.read_csv(
+            source,
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=list(dtypes),
+                column_types=column_types,
+                null_values=IMDB_NA_VALUES + [""],
+                strings_can_be_null=True,
+            ),
+        )
+
+
+def load_imdb_raw(cache: bool = False):
+    """
+    Load IMDb basics + ratings from your CSV files.
+    With cache=True the merged table is also saved to IMDB_RAW_CACHE_PATH.
+    """
     if not IMDB_BASICS.exists() or not IMDB_RATINGS.exists():
         raise FileNotFoundError("IMDb CSVs not found in data_raw/.")
 
-    basics = pd.read_csv(IMDB_BASICS)   # no sep="\t" now
-    ratings = pd.read_csv(IMDB_RATINGS)
-
     # If you preserved original column names from TSV, this will still work:
     # basics should have: tconst, primaryTitle, startYear, genres
     # ratings should have: tconst, averageRating, numVotes
-    df = basics.merge(ratings, on="tconst", how="left")
+    if USE_ARROW:
+        # Hash-join in Arrow; the row number restores basics order, which
+        # Arrow joins don't preserve
+        basics = _read_imdb_arrow(IMDB_BASICS, IMDB_BASICS_DTYPES)
+        basics = basics.append_column("_row", pa.array(np.arange(basics.num_rows)))
+        ratings = _read_imdb_arrow(IMDB_RATINGS, IMDB_RATINGS_DTYPES)
+        joined = basics.join(ratings, keys="tconst", join_type="left outer").sort_by("_row")
+        df = joined.drop_columns(["_row"]).to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        basics = pd.read_csv(   # no sep="\t" now
+            IMDB_BASICS,
+            usecols=list(IMDB_BASICS_DTYPES),
+            dtype=IMDB_BASICS_DTYPES,
+            na_values=IMDB_NA_VALUES,
+        )
+        ratings = pd.read_csv(
+            IMDB_RATINGS,
+            usecols=list(IMDB_RATINGS_DTYPES),
+            dtype=IMDB_RATINGS_DTYPES,
+            na_values=IMDB_NA_VALUES,
+        )
+        df = basics.merge(ratings, on="tconst", how="left")
 
     df = df[["tconst", "primaryTitle", "startYear", "genres", "averageRating", "numVotes"]]
-    out_path = DATA_PROC / "imdb_movies_raw.csv"
-    df.to_csv(out_path, index=False)
-    print(f"[IMDb] Saved {len(df)} movies -> {out_path}")
+    if cache:
+        save_df(df, IMDB_RAW_CACHE_PATH)
+        print(f"[IMDb] Saved {len(df)} movies -> {IMDB_RAW_CACHE_PATH}")
+    else:
+        print(f"[IMDb] Loaded {len(df)} movies")
     return df
 
 
-def load_movielens_raw():
+def load_movielens_raw(cache: bool = False):
+    """
+    Load MovieLens movies (with per-movie rating stats) and ratings.
+    With cache=True both tables are also saved to the ML_*_RAW_CACHE_PATHs.
+    """
     if not ML_MOVIES.exists() or not ML_RATINGS.exists():
         raise FileNotFoundError("MovieLens CSVs not found in data_raw/.")
 
-    movies = pd.read_csv(ML_MOVIES)
-    ratings = pd.read_csv(ML_RATINGS)
-
-    movie_stats = ratings.groupby("movieId").agg(
-        rating_mean=("rating", "mean"),
-        rating_count=("rating", "count")
+    movies = pd.read_csv(
+        ML_MOVIES, usecols=list(ML_MOVIES_DTYPES), dtype=ML_MOVIES_DTYPES, **CSV_READ_KWARGS
+    )
+    ratings = pd.read_csv(
+        ML_RATINGS, usecols=list(ML_RATINGS_DTYPES), dtype=ML_RATINGS_DTYPES, **CSV_READ_KWARGS
+    )
+
+    # Group on categorical codes rather than hashing the raw movieIds
+    movie_keys = ratings["movieId"].astype("category")
+    movie_stats = ratings["rating"].groupby(movie_keys, observed=True, sort=False).agg(
+        rating_mean="mean",
+        rating_count="count"
     ).reset_index()
+    movie_stats["movieId"] = movie_stats["movieId"].astype("int32")
 
     movies_agg = movies.merge(movie_stats, on="movieId", how="left")
 
-    movies_agg.to_csv(DATA_PROC / "movielens_movies_raw.csv", index=False)
-    ratings.to_csv(DATA_PROC / "movielens_ratings_raw.csv", index=False)
-
-    print(f"[MovieLens] Saved {len(movies_agg)} movies and {len(ratings)} ratings")
+    if cache:
+        save_df(movies_agg, ML_MOVIES_RAW_CACHE_PATH)
+        save_df(ratings, ML_RATINGS_RAW_CACHE_PATH)
+        print(f"[MovieLens] Saved {len(movies_agg)} movies and {len(ratings)} ratings")
+    else:
+        print(f"[MovieLens] Loaded {len(movies_agg)} movies and {len(ratings)} ratings")
     return movies_agg, ratings
 
 
@@ -54,6 +119,6 @@ def load_movielens_raw():
 def load_tmdb_raw():
     if not TMDB_MOVIES.exists():
         raise FileNotFoundError("TMDb CSV movies_tmdb.csv not found in data_raw/.")
-    df = pd.read_csv(TMDB_MOVIES)
+    df = pd.read_csv(TMDB_MOVIES, **CSV_READ_KWARGS)
     print(f"[TMDb] Loaded {len(df)} rows from {TMDB_MOVIES}")
     return df
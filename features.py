@@ -2,11 +2,15 @@
 
 import numpy as np
 import pandas as pd
-from collections import Counter
 from scipy.sparse import csr_matrix
 from sklearn.preprocessing import MinMaxScaler
 
-from config import INTEGRATED_MOVIES_PATH, ML_RATINGS_INTEGRATED_PATH
+from config import (
+    INTEGRATED_MOVIES_PATH,
+    ML_RATINGS_INTEGRATED_PATH,
+    ML_RATINGS_DTYPES,
+)
+from utils import load_df
 
 
 def load_integrated_data():
@@ -14,8 +18,11 @@ def load_integrated_data():
     Load integrated movies and integrated MovieLens ratings
     from the CSVs created by your prep_data.py pipeline.
     """
-    movies = pd.read_csv(INTEGRATED_MOVIES_PATH)
-    ratings = pd.read_csv(ML_RATINGS_INTEGRATED_PATH)
+    movies = load_df(INTEGRATED_MOVIES_PATH)
+    ratings = load_df(
+        ML_RATINGS_INTEGRATED_PATH,
+        dtype={**ML_RATINGS_DTYPES, "movie_id": "int32"},
+    )
 
     # Basic sanity checks
     if "movie_id" not in movies.columns:
@@ -47,32 +54,22 @@ def build_movie_feature_matrix(movies: pd.DataFrame):
       scaler: fitted MinMaxScaler for numeric features
     """
     # ---------------------------
-    # 1) Build genre vocabulary
+    # 1) Genres multi-hot
     # ---------------------------
-    genre_counts = Counter()
-    for g in movies["genres_norm"].fillna(""):
-        if not g:
-            continue
-        for genre in str(g).split("|"):
-            genre = genre.strip().lower()
-            if genre:
-                genre_counts[genre] += 1
+    # One split/explode pass: (row position, genre) pairs feed both the
+    # vocabulary counts and the multi-hot fill
+    genres = movies["genres_norm"].fillna("").astype(str).reset_index(drop=True)
+    flat = genres.str.lower().str.split("|").explode().str.strip()
+    flat = flat[flat != ""]
+    genre_counts = flat.value_counts()
 
     # Keep genres that appear more than a few times to avoid crazy sparsity
-    genres_vocab = sorted([g for g, c in genre_counts.items() if c > 5])
+    genres_vocab = sorted(genre_counts.index[genre_counts > 5])
     genre_to_idx = {g: i for i, g in enumerate(genres_vocab)}
     num_movies = len(movies)
     num_genres = len(genres_vocab)
 
-    X_genres = np.zeros((num_movies, num_genres), dtype=np.float32)
-
-    for i, gstr in enumerate(movies["genres_norm"].fillna("")):
-        if not gstr:
-            continue
-        for g in str(gstr).split("|"):
-            g = g.strip().lower()
-            if g in genre_to_idx:
-                X_genres[i, genre_to_idx[g]] = 1.0
+    genre_cols = flat.map(genre_to_idx).dropna()
 
     # ---------------------------
     # 2) Numeric features
@@ -84,16 +81,19 @@ def build_movie_feature_matrix(movies: pd.DataFrame):
         if col in movies.columns:
             numeric_cols.append(col)
 
+    # Genres and numeric blocks are written straight into one float32
+    # matrix instead of being built separately and hstacked
+    X_movie = np.zeros((num_movies, num_genres + len(numeric_cols)), dtype=np.float32)
+    X_movie[genre_cols.index.to_numpy(), genre_cols.to_numpy(dtype=np.int64)] = 1.0
+
     if not numeric_cols:
         # Fallback: no numeric features, just genres
-        X_movie = X_genres
         scaler = None
     else:
-        numeric = movies[numeric_cols].copy()
+        numeric = movies[numeric_cols].astype(float)
         numeric = numeric.fillna(numeric.mean())
         scaler = MinMaxScaler()
-        X_num = scaler.fit_transform(numeric.values.astype(float))
-        X_movie = np.hstack([X_genres, X_num])
+        X_movie[:, num_genres:] = scaler.fit_transform(numeric.values)
 
     # ---------------------------
     # 3) ID mappings
@@ -123,8 +123,9 @@ def build_user_item_matrix(ratings: pd.DataFrame):
       movie_id_to_idx_cf: dict movie_id -> col index
       idx_to_movie_id_cf: dict col index -> movie_id
     """
-    user_ids = ratings["userId"].unique()
-    movie_ids = ratings["movie_id"].unique()
+    # factorize assigns codes in order of first appearance, like unique()
+    user_codes, user_ids = pd.factorize(ratings["userId"], sort=False)
+    movie_codes, movie_ids = pd.factorize(ratings["movie_id"], sort=False)
 
     user_id_to_idx = {uid: i for i, uid in enumerate(user_ids)}
     idx_to_user_id = {i: uid for uid, i in user_id_to_idx.items()}
@@ -132,9 +133,9 @@ def build_user_item_matrix(ratings: pd.DataFrame):
     movie_id_to_idx_cf = {mid: i for i, mid in enumerate(movie_ids)}
     idx_to_movie_id_cf = {i: mid for mid, i in movie_id_to_idx_cf.items()}
 
-    rows = ratings["userId"].map(user_id_to_idx).values
-    cols = ratings["movie_id"].map(movie_id_to_idx_cf).values
-    data = ratings["rating"].astype(np.float32).values
+    rows = user_codes.astype(np.int32)
+    cols = movie_codes.astype(np.int32)
+    data = ratings["rating"].to_numpy(dtype=np.float32)
 
     num_users = len(user_ids)
     num_movies = len(movie_ids)
@@ -1,68 +1,89 @@
 # integration.py
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 
 from config import (
-    DATA_PROC,
     MEDIATED_PATH,
     INTEGRATED_MOVIES_PATH,
-    ML_RATINGS_INTEGRATED_PATH
+    ML_RATINGS_INTEGRATED_PATH,
+    ML_RATINGS_DTYPES,
+    ML_RATINGS_RAW_CACHE_PATH,
 )
 from data_load import load_movielens_raw
+from utils import save_df, load_df
+
+
+def _group_lists(groups: np.ndarray, values: pd.Series, num_groups: int) -> pd.Series:
+    """
+    Collect values into one list per group number (0..num_groups-1),
+    keeping row order inside each list. Returns an Arrow list column.
+    """
+    order = np.argsort(groups, kind="stable")
+    offsets = np.zeros(num_groups + 1, dtype=np.int32)
+    np.cumsum(np.bincount(groups, minlength=num_groups), out=offsets[1:])
+    lists = pa.ListArray.from_arrays(offsets, pa.array(values.iloc[order], from_pandas=True))
+    return pd.Series(lists, dtype=pd.ArrowDtype(lists.type))
 
 def integrate_movies(mediated: pd.DataFrame) -> pd.DataFrame:
     """
     Integrate movies by grouping on (title_norm, year).
     Simple deterministic integration for now.
     """
-    grouped = mediated.groupby(["title_norm", "year"], dropna=False)
-
-    integrated_rows = []
-    integrated_id = 1
-
-    for (title_norm, year), group in grouped:
-        # collect source ids
-        imdb_ids = group[group["source"] == "imdb"]["source_id"].tolist()
-        ml_ids = group[group["source"] == "movielens"]["source_id"].tolist()
-        tmdb_ids = group[group["source"] == "tmdb"]["source_id"].tolist()
-
-        # genres union
-        all_genres = []
-        for g in group["genres_norm"].dropna():
-            if not g:
-                continue
-            all_genres.extend(g.split("|"))
-        genres_norm = "|".join(sorted(set(all_genres))) if all_genres else ""
+    keys = ["title_norm", "year"]
+    # categorical title keys let the grouper hash int codes instead of strings
+    group_keys = pd.DataFrame({
+        "title_norm": mediated["title_norm"].astype("category"),
+        "year": mediated["year"],
+    })
+    group_id = group_keys.groupby(keys, dropna=False, observed=True).ngroup()
+    num_groups = int(group_id.max()) + 1 if len(group_id) else 0
 
-        # weighted rating
-        ratings = group["rating_value"].values
-        counts = group["rating_count"].fillna(0).values.astype(float)
+    # group keys, taken from the first row of each group
+    first_rows = mediated.loc[~group_id.duplicated(), keys]
+    first_rows.index = group_id[first_rows.index].to_numpy()
+    first_rows = first_rows.sort_index()
 
-        if np.sum(counts) > 0:
-            weighted_rating = np.nansum(ratings * counts) / np.sum(counts)
-            total_count = int(np.sum(counts))
-        else:
-            weighted_rating = np.nan
-            total_count = int(np.nansum(counts))
+    # weighted rating
+    counts = mediated["rating_count"].fillna(0).astype(float)
+    stats = pd.DataFrame({
+        "weighted": mediated["rating_value"].astype(float) * counts,
+        "count": counts,
+        "popularity": mediated["popularity"].astype(float),
+    }).groupby(group_id).agg(
+        weighted=("weighted", "sum"),
+        count=("count", "sum"),
+        popularity=("popularity", "max"),
+    )
+    rating_value = stats["weighted"] / stats["count"].where(stats["count"] > 0)
 
-        popularity = group["popularity"].max()
+    # genres union
+    has_genres = mediated["genres_norm"].notna() & (mediated["genres_norm"] != "")
+    genres = pd.DataFrame({
+        "group": group_id[has_genres],
+        "genre": mediated.loc[has_genres, "genres_norm"].str.split("|"),
+    }).explode("genre").drop_duplicates().sort_values(["group", "genre"])
+    genres_norm = genres.groupby("group")["genre"].agg("|".join)
 
-        integrated_rows.append({
-            "movie_id": integrated_id,
-            "title_norm": title_norm,
-            "year": year,
-            "genres_norm": genres_norm,
-            "rating_value": weighted_rating,
-            "rating_count": total_count,
-            "popularity": popularity,
-            "imdb_ids": "|".join(map(str, imdb_ids)),
-            "movielens_ids": "|".join(map(str, ml_ids)),
-            "tmdb_ids": "|".join(map(str, tmdb_ids))
-        })
-        integrated_id += 1
+    # every column is already one value per group, in group order
+    integrated_df = pd.DataFrame({
+        "movie_id": np.arange(1, num_groups + 1, dtype=np.int32),
+        "title_norm": first_rows["title_norm"].array,
+        "year": first_rows["year"].astype("Int16").array,
+        "genres_norm": genres_norm.reindex(range(num_groups), fill_value="").array,
+        "rating_value": rating_value.to_numpy(dtype=np.float32),
+        "rating_count": stats["count"].to_numpy(dtype=np.int32),
+        "popularity": stats["popularity"].to_numpy(),
+    })
 
-    integrated_df = pd.DataFrame(integrated_rows)
-    integrated_df.to_csv(INTEGRATED_MOVIES_PATH, index=False)
+    # collect source ids (IMDb tconsts stay strings, the others are ints)
+    for source, col in [("imdb", "imdb_ids"), ("movielens", "movielens_ids"), ("tmdb", "tmdb_ids")]:
+        is_source = mediated["source"] == source
+        ids = mediated.loc[is_source, "source_id"].astype(str)
+        if source != "imdb":
+            ids = pd.to_numeric(ids).astype("Int64")
+        integrated_df[col] = _group_lists(group_id[is_source].to_numpy(), ids, num_groups)
+    save_df(integrated_df, INTEGRATED_MOVIES_PATH)
     print(f"[Integrated] Saved {len(integrated_df)} unique movies -> {INTEGRATED_MOVIES_PATH}")
     return integrated_df
 
@@ -71,26 +92,30 @@ def map_movielens_ratings_to_integrated(integrated: pd.DataFrame) -> pd.DataFram
     """
     Join MovieLens ratings with integrated movie_ids.
     """
-    ratings_raw_path = DATA_PROC / "movielens_ratings_raw.csv"
-    if not ratings_raw_path.exists():
-        _, ratings = load_movielens_raw()
-        ratings.to_csv(ratings_raw_path, index=False)
-    ratings = pd.read_csv(ratings_raw_path)
+    if ML_RATINGS_RAW_CACHE_PATH.exists():
+        ratings = load_df(
+            ML_RATINGS_RAW_CACHE_PATH,
+            usecols=list(ML_RATINGS_DTYPES),
+            dtype=ML_RATINGS_DTYPES,
+        )
+    else:
+        _, ratings = load_movielens_raw(cache=True)
 
     # MovieLens movieId -> integrated movie_id
-    ml_to_integrated = {}
-    for _, row in integrated.iterrows():
-        ml_ids_str = row["movielens_ids"]
-        if pd.isna(ml_ids_str) or ml_ids_str == "":
-            continue
-        for mid in ml_ids_str.split("|"):
-            if not mid:
-                continue
-            ml_to_integrated[int(mid)] = row["movie_id"]
+    ml_ids = integrated["movielens_ids"]
+    if pd.api.types.infer_dtype(ml_ids, skipna=True) == "string":
+        # the CSV fallback stores the id lists pipe-joined
+        ml_ids = ml_ids.str.split("|")
+    ml_to_integrated = pd.DataFrame({
+        "movie_id": integrated["movie_id"],
+        "movieId": ml_ids,
+    }).explode("movieId")
+    ml_to_integrated["movieId"] = pd.to_numeric(ml_to_integrated["movieId"], errors="coerce")
+    ml_to_integrated = ml_to_integrated.dropna(subset=["movieId"]).astype({"movieId": "int64"})
+    ml_to_integrated = ml_to_integrated[["movieId", "movie_id"]].drop_duplicates("movieId", keep="last")
 
-    mapped = ratings[ratings["movieId"].isin(ml_to_integrated.keys())].copy()
-    mapped["movie_id"] = mapped["movieId"].map(ml_to_integrated)
+    mapped = ratings.merge(ml_to_integrated, on="movieId", how="inner")
 
-    mapped.to_csv(ML_RATINGS_INTEGRATED_PATH, index=False)
+    save_df(mapped, ML_RATINGS_INTEGRATED_PATH)
     print(f"[Ratings] Mapped {len(mapped)} ratings to integrated movie IDs -> {ML_RATINGS_INTEGRATED_PATH}")
     return mapped
@@ -1,16 +1,24 @@
 # mediated.py
 
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
-from config import DATA_PROC, MEDIATED_PATH
+from config import (
+    MEDIATED_PATH,
+    IMDB_RAW_CACHE_PATH, ML_MOVIES_RAW_CACHE_PATH,
+    IMDB_BASICS_DTYPES, IMDB_RATINGS_DTYPES, IMDB_NA_VALUES, ML_MOVIES_DTYPES,
+)
 from data_load import load_imdb_raw, load_movielens_raw, load_tmdb_raw
 from utils import (
-    normalize_title,
-    normalize_genres,
-    scale_rating_to_10,
-    extract_year_from_title,
-    extract_year_from_date,
+    normalize_title_series,
+    normalize_genres_series,
+    scale_rating_to_10_series,
+    extract_year_from_title_series,
+    extract_year_from_date_series,
+    save_df,
+    load_df,
 )
 
 
@@ -20,30 +28,22 @@ from utils import (
 
 def map_imdb_to_mediated(df_imdb: pd.DataFrame) -> pd.DataFrame:
     """Transform IMDb CSV into mediated schema."""
-    rows = []
-    for _, row in df_imdb.iterrows():
-        # startYear may be missing or non-numeric
-        try:
-            year = int(row["startYear"])
-        except Exception:
-            year = np.nan
-
-        rows.append(
-            {
-                "movie_temp_id": f"imdb:{row['tconst']}",
-                "source": "imdb",
-                "source_id": row["tconst"],
-                "title_norm": normalize_title(row["primaryTitle"]),
-                "year": year,
-                "genres_norm": normalize_genres(row["genres"], "imdb"),
-                "rating_value": scale_rating_to_10(row["averageRating"], "imdb"),
-                "rating_count": row["numVotes"],
-                "popularity": np.nan,
-                "budget": np.nan,
-                "revenue": np.nan,
-            }
-        )
-    return pd.DataFrame(rows)
+    return pd.DataFrame(
+        {
+            "movie_temp_id": "imdb:" + df_imdb["tconst"].astype(str),
+            "source": "imdb",
+            "source_id": df_imdb["tconst"],
+            "title_norm": normalize_title_series(df_imdb["primaryTitle"]),
+            # startYear may be missing or non-numeric
+            "year": pd.to_numeric(df_imdb["startYear"], errors="coerce").astype("Int64"),
+            "genres_norm": normalize_genres_series(df_imdb["genres"], "imdb"),
+            "rating_value": scale_rating_to_10_series(df_imdb["averageRating"], "imdb"),
+            "rating_count": df_imdb["numVotes"],
+            "popularity": np.nan,
+            "budget": np.nan,
+            "revenue": np.nan,
+        }
+    )
 
 
 # ---------------------------------------------------------
@@ -52,32 +52,35 @@ def map_imdb_to_mediated(df_imdb: pd.DataFrame) -> pd.DataFrame:
 
 def map_movielens_to_mediated(df_ml_movies: pd.DataFrame) -> pd.DataFrame:
     """Transform MovieLens movies CSV into mediated schema."""
-    rows = []
-    for _, row in df_ml_movies.iterrows():
-        year = extract_year_from_title(row["title"])
-
-        rows.append(
-            {
-                "movie_temp_id": f"ml:{row['movieId']}",
-                "source": "movielens",
-                "source_id": row["movieId"],
-                "title_norm": normalize_title(row["title"]),
-                "year": year,
-                "genres_norm": normalize_genres(row["genres"], "movielens"),
-                "rating_value": scale_rating_to_10(row["rating_mean"], "movielens"),
-                "rating_count": row["rating_count"],
-                "popularity": np.nan,
-                "budget": np.nan,
-                "revenue": np.nan,
-            }
-        )
-    return pd.DataFrame(rows)
+    return pd.DataFrame(
+        {
+            "movie_temp_id": "ml:" + df_ml_movies["movieId"].astype(str),
+            "source": "movielens",
+            "source_id": df_ml_movies["movieId"],
+            "title_norm": normalize_title_series(df_ml_movies["title"]),
+            "year": extract_year_from_title_series(df_ml_movies["title"]),
+            "genres_norm": normalize_genres_series(df_ml_movies["genres"], "movielens"),
+            "rating_value": scale_rating_to_10_series(df_ml_movies["rating_mean"], "movielens"),
+            "rating_count": df_ml_movies["rating_count"],
+            "popularity": np.nan,
+            "budget": np.nan,
+            "revenue": np.nan,
+        }
+    )
 
 
 # ---------------------------------------------------------
 # TMDb → Mediated (robust to different column names)
 # ---------------------------------------------------------
 
+def _first_column(df: pd.DataFrame, names, default=np.nan) -> pd.Series:
+    """Return the first of `names` present in df, else a constant Series."""
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    return pd.Series(default, index=df.index)
+
+
 def map_tmdb_to_mediated(df_tmdb: pd.DataFrame) -> pd.DataFrame:
     """
     Transform TMDb CSV into mediated schema.
@@ -107,15 +110,7 @@ def map_tmdb_to_mediated(df_tmdb: pd.DataFrame) -> pd.DataFrame:
         )
 
     # Decide which column holds genres
-    if "genre_names" in df_tmdb.columns:
-        def get_genres(row):
-            return row["genre_names"]
-    elif "genres" in df_tmdb.columns:
-        def get_genres(row):
-            return row["genres"]
-    else:
-        def get_genres(row):
-            return ""
+    genres = _first_column(df_tmdb, ["genre_names", "genres"], "")
 
     # Decide ID column
     if "id" in df_tmdb.columns:
@@ -128,87 +123,83 @@ def map_tmdb_to_mediated(df_tmdb: pd.DataFrame) -> pd.DataFrame:
 
     # Decide how to get year
     if "release_date" in df_tmdb.columns:
-        def get_year(row):
-            return extract_year_from_date(row["release_date"])
-    elif "year" in df_tmdb.columns:
-        def get_year(row):
-            try:
-                return int(row["year"])
-            except Exception:
-                return np.nan
+        year = extract_year_from_date_series(df_tmdb["release_date"])
     else:
-        def get_year(row):
-            return np.nan
-
-    rows = []
-    for _, row in df_tmdb.iterrows():
-        year = get_year(row)
-
-        # Safe gets with defaults
-        vote_avg = row["vote_average"] if "vote_average" in df_tmdb.columns else np.nan
-        vote_cnt = row["vote_count"] if "vote_count" in df_tmdb.columns else np.nan
-        popularity = row["popularity"] if "popularity" in df_tmdb.columns else np.nan
-        budget = row["budget"] if "budget" in df_tmdb.columns else np.nan
-        revenue = row["revenue"] if "revenue" in df_tmdb.columns else np.nan
-
-        rows.append(
-            {
-                "movie_temp_id": f"tmdb:{row[id_col]}",
-                "source": "tmdb",
-                "source_id": row[id_col],
-                "title_norm": normalize_title(row["title"]),
-                "year": year,
-                "genres_norm": normalize_genres(get_genres(row), "tmdb"),
-                "rating_value": scale_rating_to_10(vote_avg, "tmdb"),
-                "rating_count": vote_cnt,
-                "popularity": popularity,
-                "budget": budget,
-                "revenue": revenue,
-            }
-        )
-
-    return pd.DataFrame(rows)
+        year = pd.to_numeric(_first_column(df_tmdb, ["year"]), errors="coerce").astype("Int64")
+
+    return pd.DataFrame(
+        {
+            "movie_temp_id": "tmdb:" + df_tmdb[id_col].astype(str),
+            "source": "tmdb",
+            "source_id": df_tmdb[id_col],
+            "title_norm": normalize_title_series(df_tmdb["title"]),
+            "year": year,
+            "genres_norm": normalize_genres_series(genres, "tmdb"),
+            "rating_value": scale_rating_to_10_series(_first_column(df_tmdb, ["vote_average"]), "tmdb"),
+            "rating_count": _first_column(df_tmdb, ["vote_count"]),
+            "popularity": _first_column(df_tmdb, ["popularity"]),
+            "budget": _first_column(df_tmdb, ["budget"]),
+            "revenue": _first_column(df_tmdb, ["revenue"]),
+        }
+    )
 
 
 # ---------------------------------------------------------
 # Build mediated table from all sources
 # ---------------------------------------------------------
 
-def build_mediated_table() -> pd.DataFrame:
-    """
-    Build mediated table from IMDb, MovieLens, and TMDb
-    and save to MEDIATED_PATH.
-    """
-    imdb_raw_path = DATA_PROC / "imdb_movies_raw.csv"
-    ml_movies_raw_path = DATA_PROC / "movielens_movies_raw.csv"
-
-    # IMDb
-    if imdb_raw_path.exists():
-        df_imdb = pd.read_csv(imdb_raw_path)
-        print(f"[Mediated] Loaded IMDb raw from {imdb_raw_path}")
+def _imdb_mediated() -> pd.DataFrame:
+    """Load IMDb (from cache if present) and map it into the mediated schema."""
+    if IMDB_RAW_CACHE_PATH.exists():
+        df_imdb = load_df(
+            IMDB_RAW_CACHE_PATH,
+            dtype={**IMDB_BASICS_DTYPES, **IMDB_RATINGS_DTYPES},
+            na_values=IMDB_NA_VALUES,
+        )
+        print(f"[Mediated] Loaded IMDb raw from {IMDB_RAW_CACHE_PATH}")
     else:
-        df_imdb = load_imdb_raw()
+        df_imdb = load_imdb_raw(cache=True)
+    return map_imdb_to_mediated(df_imdb)
+
 
-    # MovieLens
-    if ml_movies_raw_path.exists():
-        df_ml_movies = pd.read_csv(ml_movies_raw_path)
-        print(f"[Mediated] Loaded MovieLens raw from {ml_movies_raw_path}")
+def _movielens_mediated() -> pd.DataFrame:
+    """Load MovieLens movies (from cache if present) and map them into the mediated schema."""
+    if ML_MOVIES_RAW_CACHE_PATH.exists():
+        df_ml_movies = load_df(
+            ML_MOVIES_RAW_CACHE_PATH,
+            dtype={**ML_MOVIES_DTYPES, "rating_mean": "float32", "rating_count": "Int32"},
+        )
+        print(f"[Mediated] Loaded MovieLens raw from {ML_MOVIES_RAW_CACHE_PATH}")
     else:
-        df_ml_movies, _ = load_movielens_raw()
+        df_ml_movies, _ = load_movielens_raw(cache=True)
+    return map_movielens_to_mediated(df_ml_movies)
+
 
-    # TMDb (your CSV)
+def _tmdb_mediated() -> pd.DataFrame:
+    """Load TMDb (your CSV) and map it into the mediated schema."""
     try:
         df_tmdb = load_tmdb_raw()
     except FileNotFoundError:
         print("[Mediated] TMDb CSV not found – proceeding without TMDb.")
         df_tmdb = pd.DataFrame()
+    return map_tmdb_to_mediated(df_tmdb)
+
 
-    # Map each source into mediated schema
-    imdb_m = map_imdb_to_mediated(df_imdb)
-    ml_m = map_movielens_to_mediated(df_ml_movies)
-    tmdb_m = map_tmdb_to_mediated(df_tmdb)
+def build_mediated_table() -> pd.DataFrame:
+    """
+    Build mediated table from IMDb, MovieLens, and TMDb
+    and save to MEDIATED_PATH.
+
+    The sources are independent, so each one is loaded and mapped in its
+    own worker process; only the mapped frames are sent back.
+    """
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(f) for f in (_imdb_mediated, _movielens_mediated, _tmdb_mediated)]
+        imdb_m, ml_m, tmdb_m = [f.result() for f in futures]
 
     mediated = pd.concat([imdb_m, ml_m, tmdb_m], ignore_index=True)
-    mediated.to_csv(MEDIATED_PATH, index=False)
+    # IMDb ids are strings, MovieLens/TMDb ids are ints; Parquet needs one type
+    mediated["source_id"] = mediated["source_id"].astype(str)
+    save_df(mediated, MEDIATED_PATH)
     print(f"[Mediated] Saved {len(mediated)} rows -> {MEDIATED_PATH}")
     return mediated
@@ -1,17 +1,51 @@
 # recommender.py
 
-from collections import defaultdict
+import pickle
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+
+try:
+    import simsimd  # optional: SIMD dot-product kernels for the content path
+except ImportError:
+    simsimd = None
+
+try:
+    import hnswlib  # optional: approximate nearest neighbours for large catalogs
+except ImportError:
+    hnswlib = None
 
 from features import (
     load_integrated_data,
     build_movie_feature_matrix,
     build_user_item_matrix,
 )
+from config import MODEL_DIR, ANN_MIN_MOVIES, ANN_EF
 from utils import normalize_title
 
+# Lookups pickled by save(); the matrices are stored as .npz/.npy beside them
+_PICKLED_STATE = [
+    "movies_df",
+    "_title_map",
+    "movie_id_to_idx_features",
+    "idx_to_movie_id_features",
+    "user_id_to_idx",
+    "idx_to_user_id",
+    "movie_id_to_idx_cf",
+    "idx_to_movie_id_cf",
+]
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, via a partial sort."""
+    k = min(k, scores.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
 
 class MovieRecommender:
     """
@@ -24,17 +58,25 @@ class MovieRecommender:
     Provides:
       - recommend_for_existing_user(userId)
       - recommend_for_new_user([titles])
+      - save(path) / MovieRecommender.load(path) to skip refitting
     """
 
     def __init__(self):
         self.movies_df = None
         self.ratings_df = None
+        self._titles = None
+        self._years = None
+        self._genres = None
+        self._title_map = None
 
         self.X_movie = None
+        self.X_movie_unit = None
+        self._ann = None
         self.movie_id_to_idx_features = None
         self.idx_to_movie_id_features = None
 
         self.R = None
+        self.R_norm = None
         self.user_id_to_idx = None
         self.idx_to_user_id = None
         self.movie_id_to_idx_cf = None
@@ -46,6 +88,11 @@ class MovieRecommender:
         movies, ratings = load_integrated_data()
         self.movies_df = movies
         self.ratings_df = ratings
+        self._index_movies()
+
+        # Map normalized title -> first matching movie_id
+        titled = movies.dropna(subset=["title_norm"]).drop_duplicates("title_norm")
+        self._title_map = dict(zip(titled["title_norm"].astype(str), titled["movie_id"]))
 
         # Build content-based feature matrix
         (
@@ -65,8 +112,96 @@ class MovieRecommender:
             self.idx_to_movie_id_cf,
         ) = build_user_item_matrix(ratings)
 
+        # Keep both matrices float32 (the builders already do); similarity
+        # products are memory-bound, so half-width values halve the traffic
+        self.X_movie = np.ascontiguousarray(self.X_movie, dtype=np.float32)
+        self.R = self.R.astype(np.float32, copy=False)
+
+        # Unit-L2 movie rows, so content cosine similarity is a plain dot
+        movie_norms = np.linalg.norm(self.X_movie, axis=1, keepdims=True)
+        movie_norms[movie_norms == 0] = 1.0
+        self.X_movie_unit = self.X_movie / movie_norms
+        self._build_ann_index()
+
+        # Unit-L2 user rows, so cosine similarity is a single sparse dot
+        norms = np.sqrt(self.R.multiply(self.R).sum(axis=1)).A1
+        inv_norms = (1.0 / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+        self.R_norm = (sparse.diags(inv_norms) @ self.R).tocsr()
+
         print("[Recommender] Fit complete. Ready to recommend.")
 
+    def _index_movies(self):
+        """Per-movie title/year/genre dicts, built once for _print_movie_list."""
+        by_id = self.movies_df.set_index("movie_id")
+        self._titles = by_id["title_norm"].fillna("").astype(str).to_dict()
+        self._years = by_id["year"].to_dict()
+        self._genres = by_id["genres_norm"].fillna("").astype(str).to_dict()
+
+    def _build_ann_index(self, saved_path=None):
+        """
+        Index X_movie_unit with HNSW when the catalog is large enough and
+        hnswlib is installed; otherwise new-user queries scan all movies.
+        Inner product on unit rows is cosine similarity.
+        """
+        self._ann = None
+        num_movies, dim = self.X_movie_unit.shape
+        if hnswlib is None or num_movies < ANN_MIN_MOVIES:
+            return
+
+        self._ann = hnswlib.Index(space="ip", dim=dim)
+        if saved_path is not None and Path(saved_path).exists():
+            self._ann.load_index(str(saved_path), max_elements=num_movies)
+        else:
+            self._ann.init_index(max_elements=num_movies, M=16, ef_construction=200)
+            self._ann.add_items(self.X_movie_unit, np.arange(num_movies))
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+
+    def save(self, path=MODEL_DIR):
+        """Write the fitted matrices and lookups to `path` for load()."""
+        if self.R is None:
+            raise RuntimeError("Model not fit yet. Call .fit() first.")
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(path / "R.npz", self.R)
+        sparse.save_npz(path / "R_norm.npz", self.R_norm)
+        np.save(path / "X_movie.npy", self.X_movie)
+        np.save(path / "X_movie_unit.npy", self.X_movie_unit)
+        if self._ann is not None:
+            self._ann.save_index(str(path / "ann_index.bin"))
+
+        state = {name: getattr(self, name) for name in _PICKLED_STATE}
+        with open(path / "state.pkl", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"[Recommender] Saved fitted model -> {path}")
+
+    @classmethod
+    def load(cls, path=MODEL_DIR):
+        """
+        Rebuild a fitted recommender from save() without touching the CSVs.
+        The dense feature matrices are memory-mapped read-only, so processes
+        loading the same model share their pages.
+        """
+        path = Path(path)
+        rec = cls()
+        rec.R = sparse.load_npz(path / "R.npz").tocsr()
+        rec.R_norm = sparse.load_npz(path / "R_norm.npz").tocsr()
+        rec.X_movie = np.load(path / "X_movie.npy", mmap_mode="r")
+        rec.X_movie_unit = np.load(path / "X_movie_unit.npy", mmap_mode="r")
+        rec._build_ann_index(saved_path=path / "ann_index.bin")
+
+        with open(path / "state.pkl", "rb") as f:
+            state = pickle.load(f)
+        for name, value in state.items():
+            setattr(rec, name, value)
+        rec._index_movies()
+
+        print(f"[Recommender] Loaded fitted model from {path}")
+        return rec
+
     # -----------------------------
     # Existing user: CF-based
     # -----------------------------
@@ -91,43 +226,37 @@ class MovieRecommender:
         u_idx = self.user_id_to_idx[user_id]
         user_row = self.R[u_idx]  # 1 x num_movies sparse
 
-        # Movies the user has already rated
-        user_ratings_dense = user_row.toarray()[0]
-        seen_movie_indices = set(np.where(user_ratings_dense > 0)[0])
+        # Movies the user has already rated: the row's stored columns
+        seen_mask = np.zeros(self.R.shape[1], dtype=bool)
+        seen_mask[user_row.indices] = True
 
         # Compute similarities on the fly (do NOT store full user-user matrix)
-        sims = cosine_similarity(user_row, self.R)[0]
+        sims = (self.R_norm @ self.R_norm[u_idx].T).toarray().ravel()
         sims[u_idx] = 0.0  # ignore self
 
         # Top neighbors
-        neighbor_indices = np.argsort(sims)[::-1][:neighbor_k]
+        neighbor_indices = _top_k(sims, neighbor_k)
         neighbor_sims = sims[neighbor_indices]
 
-        candidate_scores = defaultdict(float)
-        sim_sums = defaultdict(float)
-
-        for n_idx, sim in zip(neighbor_indices, neighbor_sims):
-            if sim <= 0:
-                continue
-            neighbor_row = self.R[n_idx].toarray()[0]
-            rated_indices = np.where(neighbor_row > 0)[0]
-
-            for m_idx in rated_indices:
-                if m_idx in seen_movie_indices:
-                    continue
-                rating = neighbor_row[m_idx]
-                candidate_scores[m_idx] += sim * rating
-                sim_sums[m_idx] += sim
+        # Aggregate neighbours with two sparse vector-matrix products: the
+        # similarity-weighted rating sums, and the similarity mass of the
+        # neighbours who rated each movie
+        sims_pos = np.clip(neighbor_sims, 0, None).astype(np.float32)
+        R_sub = self.R[neighbor_indices]
+        rated = sparse.csr_matrix(
+            (np.ones_like(R_sub.data), R_sub.indices, R_sub.indptr), shape=R_sub.shape
+        )
+        candidate_scores = sims_pos @ R_sub
+        sim_sums = sims_pos @ rated
 
-        scored_movies = []
-        for m_idx, score in candidate_scores.items():
-            if sim_sums[m_idx] > 0:
-                scored_movies.append((m_idx, score / sim_sums[m_idx]))
+        scores = np.full(candidate_scores.shape, -np.inf)
+        np.divide(candidate_scores, sim_sums, out=scores, where=sim_sums > 0)
+        scores[seen_mask] = -np.inf
 
-        scored_movies.sort(key=lambda x: x[1], reverse=True)
-        top = scored_movies[:top_k]
+        top = _top_k(scores, top_k)
+        top = top[np.isfinite(scores[top])]
 
-        top_movie_ids = [self.idx_to_movie_id_cf[m_idx] for m_idx, _ in top]
+        top_movie_ids = [self.idx_to_movie_id_cf[m_idx] for m_idx in top]
 
         self._print_movie_list(top_movie_ids, header=f"Recommendations for existing user {user_id}")
         return top_movie_ids
@@ -155,22 +284,13 @@ class MovieRecommender:
             print("[Recommender] No favorite titles provided.")
             return []
 
-        # Map normalized title -> list of movie_ids
-        title_map = defaultdict(list)
-        for _, row in self.movies_df.iterrows():
-            t = row.get("title_norm", None)
-            mid = row["movie_id"]
-            if pd.isna(t):
-                continue
-            title_map[str(t)].append(mid)
-
         # Map favorites to movie_ids
         fav_ids = []
         for raw_title in favorite_titles:
             norm = normalize_title(raw_title)
-            if norm in title_map:
+            if norm in self._title_map:
                 # Just pick the first match for now
-                fav_ids.append(title_map[norm][0])
+                fav_ids.append(self._title_map[norm])
             else:
                 print(f"[Recommender] Could not find a match for title '{raw_title}'")
 
@@ -179,35 +299,40 @@ class MovieRecommender:
             return []
 
         # Build user profile as average of favorite movie feature vectors
-        fav_vecs = []
-        for mid in fav_ids:
-            if mid in self.movie_id_to_idx_features:
-                idx = self.movie_id_to_idx_features[mid]
-                fav_vecs.append(self.X_movie[idx])
+        fav_idx = np.array([self.movie_id_to_idx_features[mid]
+                            for mid in fav_ids
+                            if mid in self.movie_id_to_idx_features], dtype=np.intp)
 
-        if not fav_vecs:
+        if fav_idx.size == 0:
             print("[Recommender] No feature vectors found for favorite titles.")
             return []
 
-        user_profile = np.mean(np.stack(fav_vecs, axis=0), axis=0, keepdims=True)
-
-        # Compute similarity to all movies
-        sims = cosine_similarity(user_profile, self.X_movie)[0]
+        user_profile = self.X_movie[fav_idx].mean(axis=0, keepdims=True)
+
+        profile_norm = np.linalg.norm(user_profile)
+        if profile_norm > 0:
+            user_profile = user_profile / profile_norm
+
+        if self._ann is not None:
+            # Approximate search; ask for extra hits to cover the favorites
+            k = min(top_k + fav_idx.size, self._ann.get_current_count())
+            self._ann.set_ef(max(ANN_EF, k))
+            labels, _ = self._ann.knn_query(user_profile, k=k)
+            labels = labels[0].astype(np.intp)
+            ranked_indices = labels[~np.isin(labels, fav_idx)][:top_k]
+        else:
+            # Cosine similarity to all movies, as a dot against the unit rows
+            if simsimd is not None:
+                sims = np.asarray(simsimd.cdist(user_profile, self.X_movie_unit, metric="dot")).ravel()
+            else:
+                sims = self.X_movie_unit @ user_profile.ravel()
 
-        # Exclude favorites from recommendations
-        excluded_indices = {self.movie_id_to_idx_features[mid]
-                            for mid in fav_ids
-                            if mid in self.movie_id_to_idx_features}
+            # Exclude favorites from recommendations
+            sims[fav_idx] = -np.inf
 
-        ranked_indices = np.argsort(sims)[::-1]
-        rec_ids = []
-        for idx in ranked_indices:
-            if idx in excluded_indices:
-                continue
-            mid = self.idx_to_movie_id_features[idx]
-            rec_ids.append(mid)
-            if len(rec_ids) == top_k:
-                break
+            ranked_indices = _top_k(sims, top_k)
+            ranked_indices = ranked_indices[np.isfinite(sims[ranked_indices])]
+        rec_ids = [self.idx_to_movie_id_features[idx] for idx in ranked_indices]
 
         self._print_movie_list(rec_ids, header="Recommendations for new user (content-based)")
         return rec_ids
@@ -218,15 +343,11 @@ class MovieRecommender:
 
     def _print_movie_list(self, movie_ids, header="Recommendations"):
         print(f"\n[{header}]")
-        im = self.movies_df.set_index("movie_id")
         for rank, mid in enumerate(movie_ids, start=1):
-            if mid not in im.index:
+            if mid not in self._titles:
                 continue
-            row = im.loc[mid]
-            title_norm = row.get("title_norm", "")
-            title = (title_norm or "").title()
-            year = row.get("year", None)
+            title = self._titles[mid].title()
+            year = self._years[mid]
             year_str = "N/A" if pd.isna(year) else str(int(year))
-            genres = row.get("genres_norm", "")
-            genres_str = genres.replace("|", ", ") if isinstance(genres, str) else ""
+            genres_str = self._genres[mid].replace("|", ", ")
             print(f"{rank}. {title} ({year_str}) | Genres: {genres_str} | movie_id={mid}")
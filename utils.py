@@ -2,6 +2,32 @@
 import re
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from config import USE_ARROW
+
+# Canonical names for genre spellings that differ across sources
+GENRE_MAPPING = {
+    "sci-fi": "science fiction",
+    "scifi": "science fiction"
+}
+
+# Multiplier that puts each source's ratings on a 0–10 scale
+RATING_SCALE = {
+    "imdb": 1.0,
+    "movielens": 2.0,
+    "tmdb": 1.0,
+}
+
+# Title patterns, compiled once; the normalizers run on every movie row
+_YEAR_TRAIL = re.compile(r"\s*\(\d{4}\)$")
+_NONALNUM = re.compile(r"[^a-z0-9\s]")
+_LEADING_ART = re.compile(r"^(the|a|an)\s+")
+_YEAR_SEARCH = re.compile(r"\((\d{4})\)")
+_DATE_YEAR = re.compile(r"^(\d{4})")
+
 
 def normalize_title(title: str) -> str:
     """Normalize titles across sources (lowercase, strip year, remove punctuation)."""
@@ -10,23 +36,36 @@ def normalize_title(title: str) -> str:
     title = str(title)
 
     # Remove year "(YYYY)" at end
-    title = re.sub(r"\s*\(\d{4}\)$", "", title)
+    title = _YEAR_TRAIL.sub("", title)
 
     # Lowercase
     title = title.lower()
 
     # Remove non-alphanumeric except spaces
-    title = re.sub(r"[^a-z0-9\s]", "", title)
+    title = _NONALNUM.sub("", title)
 
     # Collapse whitespace
     title = " ".join(title.split())
 
     # Remove leading articles optionally
-    title = re.sub(r"^(the|a|an)\s+", "", title)
+    title = _LEADING_ART.sub("", title)
 
     return title
 
 
+def normalize_title_series(titles: pd.Series) -> pd.Series:
+    """Vectorized normalize_title over a whole Series of titles."""
+    return (
+        titles.astype("string")
+        .str.replace(_YEAR_TRAIL, "", regex=True)
+        .str.lower()
+        .str.replace(_NONALNUM, "", regex=True)
+        .str.split()
+        .str.join(" ")
+        .str.replace(_LEADING_ART, "", regex=True)
+    )
+
+
 def normalize_genres(genres, source: str) -> str:
     """Normalize genre field into pipe-separated lowercase names."""
     if pd.isna(genres):
@@ -45,37 +84,74 @@ def normalize_genres(genres, source: str) -> str:
     else:
         parts = []
 
-    mapping = {
-        "sci-fi": "science fiction",
-        "scifi": "science fiction"
-    }
-
-    norm = [mapping.get(g, g) for g in parts]
+    norm = [GENRE_MAPPING.get(g, g) for g in parts]
     if not norm:
         return ""
     return "|".join(sorted(set(norm)))
 
 
+def normalize_genres_series(genres: pd.Series, source: str) -> pd.Series:
+    """Vectorized normalize_genres over a whole Series of genre strings."""
+    if source not in ("imdb", "movielens", "tmdb"):
+        return pd.Series("", index=genres.index, dtype=object)
+
+    g = pd.Series(genres.to_numpy(), dtype="string")
+    if source == "tmdb":
+        g = g.str.strip("[]")
+    sep = "|" if source == "movielens" else ","
+
+    parts = g.str.split(sep, regex=False).explode().dropna()
+    if source == "tmdb":
+        parts = parts[parts.str.strip() != ""].str.strip(" '\"")
+    else:
+        parts = parts.str.strip()
+    parts = parts.str.lower().replace(GENRE_MAPPING)
+
+    # one (row, genre) pair per distinct genre, sorted, then joined per row
+    pairs = parts.rename("genre").rename_axis("row").reset_index()
+    pairs = pairs.drop_duplicates().sort_values(["row", "genre"])
+    joined = pairs.groupby("row", sort=False)["genre"].agg("|".join)
+
+    out = joined.reindex(range(len(g)), fill_value="")
+    out.index = genres.index
+    return out.astype(object)
+
+
 def scale_rating_to_10(rating, source: str):
     """Scale MovieLens ratings from 0.5–5 to 0–10; IMDb/TMDb already 0–10."""
     if pd.isna(rating):
         return np.nan
-    r = float(rating)
-    if source == "movielens":
-        return r * 2.0
-    return r
+    return float(rating) * RATING_SCALE.get(source, 1.0)
+
+
+def scale_rating_to_10_array(ratings: np.ndarray, source: str) -> np.ndarray:
+    """Vectorized scale_rating_to_10 over a float array; NaNs stay NaN."""
+    ratings = np.asarray(ratings, dtype=np.float32)
+    return ratings * np.float32(RATING_SCALE.get(source, 1.0))
+
+
+def scale_rating_to_10_series(ratings: pd.Series, source: str) -> pd.Series:
+    """Vectorized scale_rating_to_10 over a whole Series of ratings."""
+    values = pd.to_numeric(ratings, errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+    return pd.Series(scale_rating_to_10_array(values, source), index=ratings.index)
 
 
 def extract_year_from_title(title: str):
     """Extract year from MovieLens titles like 'Toy Story (1995)'."""
     if pd.isna(title):
         return np.nan
-    m = re.search(r"\((\d{4})\)", str(title))
+    m = _YEAR_SEARCH.search(str(title))
     if m:
         return int(m.group(1))
     return np.nan
 
 
+def extract_year_from_title_series(titles: pd.Series) -> pd.Series:
+    """Vectorized extract_year_from_title over a whole Series of titles."""
+    year = titles.astype("string").str.extract(_YEAR_SEARCH, expand=False)
+    return pd.to_numeric(year).astype("Int64")
+
+
 def extract_year_from_date(date_str: str):
     """Extract year from 'YYYY-MM-DD' or 'YYYY'."""
     if pd.isna(date_str):
@@ -84,3 +160,34 @@ def extract_year_from_date(date_str: str):
     if len(s) >= 4 and s[:4].isdigit():
         return int(s[:4])
     return np.nan
+
+
+def extract_year_from_date_series(dates: pd.Series) -> pd.Series:
+    """Vectorized extract_year_from_date over a whole Series of dates."""
+    year = dates.astype("string").str.extract(_DATE_YEAR, expand=False)
+    return pd.to_numeric(year).astype("Int64")
+
+
+def save_df(df: pd.DataFrame, path) -> None:
+    """Write a pipeline table as zstd Parquet (plain CSV when USE_ARROW is off)."""
+    if USE_ARROW:
+        # The Arrow schema carries the column types; pandas' own dtype metadata
+        # can't describe Arrow list columns, so it is left out of the file
+        table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata()
+        pq.write_table(table, path, compression="zstd")
+        return
+
+    # CSV has no list type: write Arrow list columns pipe-joined
+    df = df.copy(deep=False)
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.ArrowDtype) and pa.types.is_list(dtype.pyarrow_dtype):
+            lists = pa.array(df[col]).cast(pa.list_(pa.string()))
+            df[col] = pd.Series(pc.binary_join(lists, "|"), index=df.index, dtype=pd.ArrowDtype(pa.string()))
+    df.to_csv(path, index=False)
+
+
+def load_df(path, **csv_kwargs) -> pd.DataFrame:
+    """Read a table written by save_df; csv_kwargs only apply to the CSV fallback."""
+    if USE_ARROW:
+        return pd.read_parquet(path, engine="pyarrow", dtype_backend="pyarrow")
+    return pd.read_csv(path, **csv_kwargs)